@@ -1,9 +1,10 @@
 """This module allows writing and reading files by preventing external 
 programs from accessing the file while it is in use.
 
-WARNING: At the moment a real blocking is only achieved on Windows, on the 
-other platforms only a warning will be produced, so it will still be 
-possible to manipulate the files from external programs. 
+WARNING: At the moment a real blocking is only achieved on Windows. On the 
+other platforms an exclusive lock (fcntl.flock) is used, which is only 
+advisory, so it will still be possible to manipulate the files from 
+external programs that do not lock them.
 
 Example:
 file = LockFile("file.txt", "w")
@@ -19,11 +20,17 @@ from io import UnsupportedOperation
 from os.path import exists, sep, splitdrive
 from sys import platform
 
-if platform.startswith("win32"):
-    from ctypes import WinDLL, byref, cast, c_char, c_char_p, c_void_p, sizeof
+# The platform is checked only once.
+_WINDOWS = platform.startswith("win32")
+
+if _WINDOWS:
+    from ctypes import (
+        Structure, WinDLL, addressof, byref, cast, c_char, c_char_p,
+        c_size_t, c_void_p, sizeof)
     from ctypes.wintypes import (
         DWORD, BOOL, HANDLE, HLOCAL, LARGE_INTEGER, LPDWORD, LPWSTR,
         PLARGE_INTEGER)
+    from threading import Lock
 
     kernel32 = WinDLL("KERNEL32")
 
@@ -33,6 +40,7 @@ if platform.startswith("win32"):
     _WriteFile = kernel32.WriteFile
     _ReadFile = kernel32.ReadFile
     _CloseHandle = kernel32.CloseHandle
+    _FlushFileBuffers = kernel32.FlushFileBuffers
 
     # Other functions:
     _GetLastError = kernel32.GetLastError
@@ -56,6 +64,9 @@ if platform.startswith("win32"):
 
     _CloseHandle.argtypes = (HANDLE,)
 
+    _FlushFileBuffers.argtypes = (HANDLE,)
+    _FlushFileBuffers.restype = BOOL
+
     _GetLastError.restype = DWORD
 
     _FormatMessage.argtypes = (
@@ -68,6 +79,13 @@ if platform.startswith("win32"):
     _GetFileSize.argtypes = (HANDLE, PLARGE_INTEGER)
     _GetFileSize.restype = BOOL
 
+    class _OVERLAPPED(Structure):
+        # Only the offset is used, the files are not opened for asynchronous
+        # operations.
+        _fields_ = (
+            ("Internal", c_size_t), ("InternalHigh", c_size_t),
+            ("Offset", DWORD), ("OffsetHigh", DWORD), ("hEvent", HANDLE))
+
     def _MAKELANGID(primary: int, sublang: int) -> int:
         # Gets the user's language code.
         return (primary & 0xFF) | (sublang & 0xFF) << 16
@@ -91,21 +109,42 @@ if platform.startswith("win32"):
 
         return out
 
-    def _GetAddress(_object) -> int:
-        # Gets the memory address of one of C.
-        address = str(byref(_object))
-        return int(address[address.find("(")+1:address.find(")")], 16)
-
     # Modes:
     WRITEMODE = 1073741824
     READMODE = -2147483648
     APPENDMODE = WRITEMODE
     WRITEANDREADMODE = WRITEMODE | READMODE
 
+    # Flags and attributes of CreateFileW:
+    _ACCESSPATTERNS = {"sequential": 0x08000000, "random": 0x10000000}
+    _WRITETHROUGH = 0x80000000
+
+    # Value returned by CreateFileW when it fails (all bits set, so its size 
+    # depends on the platform).
+    _INVALID_HANDLE_VALUE = HANDLE(-1).value
+
 else:
     from fcntl import LOCK_EX, LOCK_NB, flock
-    from io import IOBase
-    from os.path import getsize
+    from functools import partial
+    from os import (
+        O_CREAT, O_SYNC, O_TRUNC, fstat, fsync, ftruncate, open as os_open,
+        pread, pwrite)
+
+    try: # posix_fadvise is not available on all systems, such as macOS.
+        from os import POSIX_FADV_RANDOM, POSIX_FADV_SEQUENTIAL, posix_fadvise
+        _ACCESSPATTERNS = {
+            "sequential": POSIX_FADV_SEQUENTIAL, "random": POSIX_FADV_RANDOM}
+    except ImportError:
+        posix_fadvise = None
+
+    def _Opener(extraflags: int, path: str, flags: int) -> int:
+        # Opens the file adding extraflags to the flags chosen by "open". 
+        # O_TRUNC is removed so that the "w" mode does not empty the file 
+        # before it is locked, "Open" truncates it afterwards.
+        return os_open(path, (flags & ~O_TRUNC) | extraflags, 0o666)
+
+    # Buffer size used by the files opened to write (1 MiB).
+    WRITEBUFFERSIZE = 1 << 20
 
     # Modes:
     WRITEMODE = "w"
@@ -113,23 +152,48 @@ else:
     APPENDMODE = "a"
     WRITEANDREADMODE = "r+"
 
-# Maximum data per iteration
-MAXDATAPERITE = 100000
+# Valid modes: (mode, createdisposition, binary). The createdisposition is 
+# only used on Windows: 2 creates new, 3 opens existing and 4 opens existing 
+# or creates new.
+_MODES = {
+    'w': (WRITEMODE, 2, False), 'wb': (WRITEMODE, 2, True),
+    'r': (READMODE, 3, False), 'rb': (READMODE, 3, True),
+    'a': (APPENDMODE, 4, False), 'ab': (APPENDMODE, 4, True),
+    'rw': (WRITEANDREADMODE, 4, False), 'rwb': (WRITEANDREADMODE, 4, True)}
+
+# Maximum data per iteration (8 MiB)
+MAXDATAPERITE = 1 << 23
 
 class LockFile:
     def __init__(self, filename: str=None, 
-                    mode: str=None, encoding: str=None):
-        self.__modes = ('w', 'r', 'a', 'rw',
-                        'wb', 'rb', 'ab', 'rwb')
+                    mode: str=None, encoding: str=None,
+                    access_pattern: str=None, write_through: bool=False):
         self._filename = ""
         self._mode = None
         self.__file = None
         self.__binary = False
+        self.__write_through = False
+        self.__opened = False
+        self.__readable = False
+        self.__writeable = False
+        self.__append = False
+
+        if _WINDOWS:
+            # Reused by every call to WriteFile, ReadFile, SetFilePointerEx
+            # and GetFileSizeEx.
+            self.__bytes_rw = DWORD()
+            self.__bytes_rw_ref = byref(self.__bytes_rw)
+            self.__pos_out = LARGE_INTEGER()
+            self.__pos_out_ref = byref(self.__pos_out)
+            # Held by ReadAt and WriteAt while they move the cursor.
+            self.__at_lock = Lock()
 
         if filename != None or mode != None:
-            self.Open(filename, mode, encoding)
+            self.Open(
+                filename, mode, encoding, access_pattern, write_through)
 
-    def Open(self, filename: str, mode: str, encoding: str=None):
+    def Open(self, filename: str, mode: str, encoding: str=None,
+                access_pattern: str=None, write_through: bool=False):
         """Opens the specified file.
 
         Arguments: 
@@ -158,17 +222,21 @@ class LockFile:
         systems. On Windows, UTF-8 is used by default or ISO-8859-1 if 
         UTF-8 fails. If this argument is left None, UTF-8 will be used by 
         default.
-        """
 
-        if platform.startswith("win32"):
-            if isinstance(self.__file, HANDLE) and self._filename != "":
-                raise UnsupportedOperation(
-                    "Close the file first before opening another one.")
+        access_pattern: A string that tells the system how the file will be 
+        accessed, so that it can read ahead accordingly. It can be 
+        "sequential" or "random". If this argument is left None, "random" 
+        will be used for the "rw" and "rwb" modes and "sequential" for the 
+        others.
 
-        else:
-            if isinstance(self.__file, IOBase) and self._filename != "":
-                raise UnsupportedOperation(
-                    "Close the file first before opening another one.")
+        write_through: If it is True, each write goes directly to the disk 
+        instead of staying in the system cache. It is slower, but no data 
+        is lost if the system stops.
+        """
+
+        if self.__opened:
+            raise UnsupportedOperation(
+                "Close the file first before opening another one.")
 
         if type(filename) != str:
             raise TypeError('Only "str" and "bytes" data types are accepted.')
@@ -179,52 +247,43 @@ class LockFile:
 
         self._filename = filename
 
-        if not mode in self.__modes:
+        if type(mode) != str or not mode in _MODES:
             raise ValueError(
                 f'The "{mode}" mode is invalid. Valid modes: ' \
                 + 'w, r, a, rw, wb, rb, ab and rwb')
 
-        elif mode.startswith('rw'): # Create new or open existing.
-            self._mode = WRITEANDREADMODE
-            if platform.startswith("win32"):
-                if not exists(filename): createdisposition = 2
-                else: createdisposition = 3
-
-        elif mode.startswith('w'): # Create new.
-            self._mode = WRITEMODE
-            if platform.startswith("win32"): createdisposition = 2
+        self._mode, createdisposition, self.__binary = _MODES[mode]
 
-        elif mode.startswith('r'): # Read existing.
-            if not exists(filename):
-                raise FileNotFoundError(
-                    f'The file "{filename}" does not exist.')
+        if self._mode == READMODE and not exists(filename):
+            raise FileNotFoundError(f'The file "{filename}" does not exist.')
 
-            self._mode = READMODE
-            if platform.startswith("win32"): createdisposition = 3
-
-        elif mode.startswith('a'): # Create new or open existing.    
-            self._mode = APPENDMODE
-            if platform.startswith("win32"):
-                if not exists(filename): createdisposition = 2
-                else: createdisposition = 3
+        if access_pattern == None:
+            if self._mode == WRITEANDREADMODE: access_pattern = "random"
+            else: access_pattern = "sequential"
+        elif not access_pattern in ("sequential", "random"):
+            raise ValueError(
+                f'The "{access_pattern}" access pattern is invalid. Valid ' \
+                + 'access patterns: sequential and random')
 
-        # Habilite binary mode.
-        if not platform.startswith("win32") and mode.endswith("b"):
-            self._mode += "b"
-            self.__binary = True
+        if type(write_through) != bool:
+            raise TypeError('The "write_through" argument must be a bool.')
 
-        elif mode.endswith("b"):
-            self.__binary = True
+        if _WINDOWS:
+            flags = 128 | _ACCESSPATTERNS[access_pattern]
+            if write_through: flags |= _WRITETHROUGH
 
-        if platform.startswith("win32"):
-            self.__file = HANDLE(_CreateFile(
+            handle = _CreateFile(
                 self._filename, self._mode, 0, None,
-                createdisposition, 128, None)
-                )
+                createdisposition, flags, None)
 
-            if self.__file == 4294967295: raise OSError(_GetMessageError())
+            # HANDLE objects are compared by identity, so the raw value is 
+            # checked before wrapping it.
+            if handle == _INVALID_HANDLE_VALUE:
+                raise OSError(_GetMessageError())
 
-            if mode.startswith('a'): self.Seek(0, "end")
+            self.__file = HANDLE(handle)
+
+            if mode.startswith('a'): self.__Seek(0, 2)
         
         else: # Other systems
             if encoding == None:
@@ -232,16 +291,47 @@ class LockFile:
             elif type(encoding) != str:
                 raise TypeError('The "encoding" argument must be a string.')
 
-            if self._mode.startswith("r+") and not exists(filename):
-                open(filename, "w").close()
+            if self._mode == READMODE: buffering = -1
+            else: buffering = WRITEBUFFERSIZE
+
+            # "r+" does not create the file, so O_CREAT is added, which 
+            # creates it only if it does not exist.
+            extraflags = 0
+            if self._mode == WRITEANDREADMODE: extraflags |= O_CREAT
+            if write_through: extraflags |= O_SYNC
 
-            if self.__binary: self.__file = open(filename, self._mode)
+            opener = partial(_Opener, extraflags)
+
+            if self.__binary: self.__file = open(
+                                filename, self._mode + "b", buffering,
+                                opener = opener)
             else: self.__file = open(
-                                filename, self._mode, encoding = encoding)
+                                filename, self._mode, buffering,
+                                encoding = encoding, opener = opener)
+
+            # flock locks each opened file separately, so a second file 
+            # opened in the same process is also refused.
+            try:
+                flock(self.__file.fileno(), LOCK_EX | LOCK_NB)
+            except BlockingIOError:
+                self.__file.close()
+                self.Close()
+                raise OSError(f'The file "{filename}" is already locked.')
 
-            flock(self.__file, LOCK_EX | LOCK_NB)
+            # The file is emptied only once it is locked.
+            if self._mode == WRITEMODE: ftruncate(self.__file.fileno(), 0)
 
-            self._mode = self._mode.replace("b", "")
+            self.__write_through = write_through
+
+            if posix_fadvise != None:
+                posix_fadvise(
+                    self.__file.fileno(), 0, 0,
+                    _ACCESSPATTERNS[access_pattern])
+
+        self.__opened = True
+        self.__readable = self._mode in (READMODE, WRITEANDREADMODE)
+        self.__writeable = self._mode != READMODE
+        self.__append = mode.startswith('a')
 
     def Write(self, data):
         """This method is used to write data to the file, accepting byte 
@@ -255,33 +345,54 @@ class LockFile:
         elif not self.__binary and type(data) != str:
             raise TypeError("Only string literals can be written.")
 
-        if self._mode == READMODE:
+        if not self.__writeable:
             raise UnsupportedOperation(
                 "The file was not opened in write mode.")
 
-        if platform.startswith("win32"):
-            if type(data) == str: data = bytes(data, encoding = "UTF-8")
-            count = 0
+        self.__WriteData(data)
 
-            while len(data) != count:
-                if (len(data)-count) > MAXDATAPERITE:
-                    _return = _WriteFile(
-                        self.__file, data[count:], MAXDATAPERITE,
-                        byref(DWORD()), None)
+    def WriteLines(self, lines):
+        """This method writes all the byte literals or strings contained in 
+        "lines" with a single call to "Write", which is faster than writing 
+        them one by one. Line separators are not added.
+        """
+        self._HaveFileOpen()
+
+        if not self.__writeable:
+            raise UnsupportedOperation(
+                "The file was not opened in write mode.")
 
-                    count += MAXDATAPERITE
+        try:
+            if self.__binary: data = b"".join(lines)
+            else: data = "".join(lines)
 
-                else:
-                    _return = _WriteFile(
-                        self.__file, data[count:], len(data[count:]),
-                        byref(DWORD()), None)
+        except TypeError:
+            if self.__binary:
+                raise TypeError("Only byte literals can be written.") from None
+            else:
+                raise TypeError(
+                    "Only string literals can be written.") from None
 
-                    count = len(data)
+        self.Write(data)
 
-                if not _return: raise OSError(_GetMessageError())
+    def Flush(self):
+        """This method writes to the disk all the data that is still 
+        pending, so that it is not lost if the program ends before calling 
+        "Close".
+        """
+        self._HaveFileOpen()
+
+        if not self.__writeable:
+            raise UnsupportedOperation(
+                "The file was not opened in write mode.")
+
+        if _WINDOWS:
+            if not _FlushFileBuffers(self.__file):
+                raise OSError(_GetMessageError())
 
         else:
-            self.__file.write(data)
+            self.__file.flush()
+            fsync(self.__file.fileno())
 
     def Read(self, n_chars: int=-1) -> str:
         """This method is to read the data or characters contained in the 
@@ -299,52 +410,100 @@ class LockFile:
         """
         self._HaveFileOpen()
 
-        if self._mode == WRITEMODE:
+        if not self.__readable:
             raise UnsupportedOperation(
                 "The file was not opened in read mode.")
 
         if type(n_chars) != int:
             raise TypeError('"n_chars" must be a integer.')
 
-        if self.Seek(0) >= self.GetFileSize():
+        size = self.GetFileSize()
+        pos = self.GetCursorPos()
+
+        if pos >= size:
             n_chars = 0
-        elif (self.GetFileSize()-self.Seek(0)+n_chars+1) < 0:
+        elif (size-pos+n_chars+1) < 0:
             n_chars = 0
         elif n_chars < 0:
-            n_chars = self.GetFileSize() - self.Seek(0) + (n_chars + 1)
-        elif (self.Seek(0)+n_chars) > self.GetFileSize():
-            n_chars = self.GetFileSize() - self.Seek(0)
+            n_chars = size - pos + (n_chars + 1)
+        elif (pos+n_chars) > size:
+            n_chars = size - pos
 
-        if platform.startswith("win32"):
-            out = (c_char * (sizeof(c_char)*n_chars))()
-            count = 0
+        return self.__ReadData(n_chars)
+
+    def ReadInto(self, buffer: bytearray) -> int:
+        """This method reads the file data directly into "buffer", so that 
+        the same buffer can be reused in several reads. Returns an integer 
+        with the number of bytes read, which is less than the buffer size 
+        when the end of the file is reached. Binary mode only.
+
+        Argument:
+        buffer: A bytearray in which the data will be saved.
+        """
+        self._HaveFileOpen()
 
-            while (n_chars-count) != 0:
-                if (n_chars-count) > MAXDATAPERITE:
-                    address = _GetAddress(out) + (sizeof(c_char)*count)
+        if not self.__readable:
+            raise UnsupportedOperation(
+                "The file was not opened in read mode.")
 
-                    _return = _ReadFile(
-                        self.__file, address, MAXDATAPERITE, 
-                        byref(DWORD()), None)
+        if not self.__binary:
+            raise UnsupportedOperation(
+                "The file was not opened in binary mode.")
 
-                    count += MAXDATAPERITE
+        if type(buffer) != bytearray:
+            raise TypeError('"buffer" must be a bytearray.')
 
-                else:
-                    address = _GetAddress(out) + (sizeof(c_char)*count)
+        return self.__ReadInto(buffer)
 
-                    _return = _ReadFile(
-                        self.__file, address, n_chars-count, 
-                        byref(DWORD()), None)
+    def ReadAt(self, pos: int, n_bytes: int) -> bytes:
+        """This method reads bytes starting at the given position, the 
+        cursor stays where it was. Returns a byte literal, which is shorter 
+        than n_bytes when the end of the file is reached. Binary mode only.
 
-                    count = n_chars
+        Several threads can call ReadAt and WriteAt at the same time, but 
+        on Windows the cursor is moved during the call, so they must not be
+        mixed with Read, Write or Seek from other threads.
 
-                if _return == False: raise OSError(_GetMessageError())
+        Arguments:
+        pos: A non-negative integer with the position from which to read.
 
-            if self.__binary: return out.raw
-            else: return self._BytesToStr(out.raw)
+        n_bytes: A non-negative integer with the number of bytes to read.
+        """
+        self.__ValidateAt(pos, self.__readable, "read")
 
-        else:
-            return self.__file.read(n_chars)
+        if type(n_bytes) != int:
+            raise TypeError('"n_bytes" must be a integer.')
+        elif n_bytes < 0:
+            raise ValueError('"n_bytes" must be a non-negative integer.')
+
+        # Nothing past the end of the file is read, so n_bytes is not 
+        # allocated in full when it is bigger than the file.
+        n_bytes = min(n_bytes, max(self.GetFileSize()-pos, 0))
+
+        return self.__ReadAt(pos, n_bytes)
+
+    def WriteAt(self, pos: int, data: bytes):
+        """This method writes a byte literal starting at the given position, 
+        the cursor stays where it was. Binary mode only, and it cannot be 
+        used in append mode.
+
+        The same thread rules as in ReadAt apply.
+
+        Arguments:
+        pos: A non-negative integer with the position from which to write.
+
+        data: The byte literal to write.
+        """
+        self.__ValidateAt(pos, self.__writeable, "write")
+
+        if self.__append:
+            raise UnsupportedOperation(
+                "The data cannot be written at a position in append mode.")
+
+        if type(data) != bytes:
+            raise TypeError("Only byte literals can be written.")
+
+        self.__WriteAt(pos, data)
 
     def Seek(self, offset: int, startpoint: str="current") -> int:
         """This method is to position the file cursor where desired. Returns
@@ -360,6 +519,9 @@ class LockFile:
             begin: To start from the zero position or the beginning.
             current: To start from the current cursor position.
             end: To start from the end.
+
+        Seek(0) does not move the cursor, to know its position use 
+        "GetCursorPos" instead, which does not repeat the validations.
         """
         self._HaveFileOpen()
 
@@ -368,7 +530,157 @@ class LockFile:
                 'The argument "offset" must be a positive or negative ' \
                 + 'integer.')
 
-        if platform.startswith("win32"):
+        return self.__SeekFrom(offset, startpoint)
+
+    def Seek2(self, pos: int) -> int:
+        """Unlike the "Seek" method, this method positions the cursor at the
+         specified position and not in a scrolling manner. Returns an 
+        integer with the new position.
+
+        It works in the same way as the "seek" method of "open", also this 
+        is equivalent to Seek(pos, "begin").
+        """
+        return self.Seek(pos, "begin")
+
+    # Platform-specific methods, chosen once when the class is defined:
+    if _WINDOWS:
+        def Close(self):
+            # Close the file.
+            if self.__opened: _CloseHandle(self.__file)
+
+            self._filename = b""
+            self._mode = None
+            self.__file = None
+            self.__binary = False
+            self.__write_through = False
+            self.__opened = False
+            self.__readable = False
+            self.__writeable = False
+            self.__append = False
+
+        def GetFileSize(self) -> int:
+            """ The current file size is obtained. Returns an integer with 
+            the new position.
+            """
+            self._HaveFileOpen()
+
+            # A local structure, since ReadAt may be called from several 
+            # threads.
+            size = LARGE_INTEGER()
+            _return = _GetFileSize(self.__file, byref(size))
+            if not _return: raise OSError(_GetMessageError())
+            return size.value
+
+        def GetCursorPos(self) -> int:
+            """The current cursor position is obtained, it is equivalent to 
+            calling Seek(0, "current"). Returns an integer with the new 
+            position.
+            """
+            self._HaveFileOpen()
+
+            return self.__Seek(0, 1)
+
+        def __WriteData(self, data):
+            # Writes the data already validated by "Write".
+            if type(data) == str: data = bytes(data, encoding = "UTF-8")
+            # A bytes object is immutable and does not move, so its buffer 
+            # is passed directly instead of copying each block.
+            self.__Transfer(
+                _WriteFile, cast(c_char_p(data), c_void_p).value, len(data))
+
+        def __ReadData(self, n_chars: int):
+            # Reads the number of characters already calculated by "Read".
+            out = bytearray(n_chars)
+            self.__Transfer(
+                _ReadFile, addressof((c_char * n_chars).from_buffer(out)),
+                n_chars)
+
+            if self.__binary: return bytes(out)
+            else: return self._BytesToStr(out)
+
+        def __ReadInto(self, buffer: bytearray) -> int:
+            # Reads into the buffer validated by "ReadInto".
+            n_bytes = min(
+                len(buffer), max(self.GetFileSize()-self.GetCursorPos(), 0))
+
+            self.__Transfer(
+                _ReadFile,
+                addressof((c_char * len(buffer)).from_buffer(buffer)),
+                n_bytes)
+
+            return n_bytes
+
+        def __ReadAt(self, pos: int, n_bytes: int) -> bytes:
+            # Reads at the position validated by "ReadAt".
+            out = bytearray(n_bytes)
+
+            # The synchronous handles also move the cursor when an offset is 
+            # given, so it is restored afterwards. The lock and the local 
+            # structures keep other threads from changing it in between.
+            pos_out = LARGE_INTEGER()
+            with self.__at_lock:
+                cursor = self.__Seek(0, 1, pos_out)
+                try:
+                    self.__Transfer(
+                        _ReadFile,
+                        addressof((c_char * n_bytes).from_buffer(out)),
+                        n_bytes, pos)
+                finally:
+                    self.__Seek(cursor, 0, pos_out)
+
+            return bytes(out)
+
+        def __WriteAt(self, pos: int, data: bytes):
+            # Writes at the position validated by "WriteAt", restoring the 
+            # cursor as "__ReadAt" does.
+            pos_out = LARGE_INTEGER()
+            with self.__at_lock:
+                cursor = self.__Seek(0, 1, pos_out)
+                try:
+                    self.__Transfer(
+                        _WriteFile, cast(c_char_p(data), c_void_p).value,
+                        len(data), pos)
+                finally:
+                    self.__Seek(cursor, 0, pos_out)
+
+        def __Transfer(self, function, base: int, n_bytes: int,
+                        offset: int=None):
+            # Reads or writes, depending on whether function is _ReadFile or 
+            # _WriteFile, n_bytes at the memory address base in blocks of 
+            # MAXDATAPERITE bytes, from offset if it is given or else from 
+            # the cursor. The calls with an offset come from ReadAt and 
+            # WriteAt, so they use their own structures.
+            count = 0
+
+            # Local names are faster to look up than globals and attributes.
+            handle = self.__file
+            maxdata = MAXDATAPERITE
+
+            if offset != None:
+                overlapped = _OVERLAPPED()
+                transferred = byref(DWORD())
+            else:
+                overlapped = None
+                transferred = self.__bytes_rw_ref
+
+            while n_bytes != count:
+                n = min(maxdata, n_bytes-count)
+
+                if overlapped == None: _return = function(
+                    handle, base + count, n, transferred, None)
+                else:
+                    overlapped.Offset = (offset+count) & 0xFFFFFFFF
+                    overlapped.OffsetHigh = (offset+count) >> 32
+                    _return = function(
+                        handle, base + count, n, transferred,
+                        byref(overlapped))
+
+                if not _return: raise OSError(_GetMessageError())
+
+                count += n
+
+        def __SeekFrom(self, offset: int, startpoint: str) -> int:
+            # Moves the cursor once "Seek" has validated the offset.
             LARGE_INTEGER_size = 2 ** (sizeof(LARGE_INTEGER) * 8)
 
             last_offset = self.__Seek(0, 1)
@@ -377,7 +689,7 @@ class LockFile:
                 offset = 0 
             elif offset < 0 and startpoint == "end":
                 self.__Seek(0, 2)
-                return self.Seek(offset, "current")
+                return self.__SeekFrom(offset, "current")
             elif offset < 0 and (last_offset+offset) < 0:
                 offset = -last_offset
             elif offset > (LARGE_INTEGER_size//2-1+last_offset):
@@ -391,10 +703,89 @@ class LockFile:
 
             return self.__Seek(offset, startpoint)
 
-        else:
+        def __Seek(self, offset: int, startpoint: int,
+                   pos_out: LARGE_INTEGER=None) -> int:
+            # Calls SetFilePointerEx directly, saving the new position in 
+            # pos_out if it is given.
+            if pos_out == None:
+                _return = _SetFilePointer(
+                    self.__file, offset, self.__pos_out_ref, startpoint)
+                pos_out = self.__pos_out
+            else:
+                _return = _SetFilePointer(
+                    self.__file, offset, byref(pos_out), startpoint)
+
+            if not _return: raise OSError(_GetMessageError())
+            return pos_out.value
+
+    else:
+        def Close(self):
+            # Close the file.
+            if self.__opened: self.__file.close()
+
+            self._filename = b""
+            self._mode = None
+            self.__file = None
+            self.__binary = False
+            self.__write_through = False
+            self.__opened = False
+            self.__readable = False
+            self.__writeable = False
+            self.__append = False
+
+        def GetFileSize(self) -> int:
+            """ The current file size is obtained. Returns an integer with 
+            the new position.
+            """
+            self._HaveFileOpen()
+
+            if self.__writeable: self.__file.flush()
+            return fstat(self.__file.fileno()).st_size
+
+        def GetCursorPos(self) -> int:
+            """The current cursor position is obtained, it is equivalent to 
+            calling Seek(0, "current"). Returns an integer with the new 
+            position.
+            """
+            self._HaveFileOpen()
+
+            return self.__file.tell()
+
+        def __WriteData(self, data):
+            # Writes the data already validated by "Write".
+            self.__file.write(data)
+            if self.__write_through: self.__file.flush()
+
+        def __ReadData(self, n_chars: int):
+            # Reads the number of characters already calculated by "Read".
+            return self.__file.read(n_chars)
+
+        def __ReadInto(self, buffer: bytearray) -> int:
+            # Reads into the buffer validated by "ReadInto".
+            return self.__file.readinto(buffer)
+
+        def __ReadAt(self, pos: int, n_bytes: int) -> bytes:
+            # Reads at the position validated by "ReadAt". The data still in 
+            # the buffer was already written by "GetFileSize".
+            return pread(self.__file.fileno(), n_bytes, pos)
+
+        def __WriteAt(self, pos: int, data: bytes):
+            # Writes at the position validated by "WriteAt". The buffer is 
+            # emptied first so that it does not overwrite the new data or 
+            # keep an old copy of it.
+            self.__file.flush()
+            fileno = self.__file.fileno()
+            view = memoryview(data)
+            count = 0
+
+            while len(data) != count:
+                count += pwrite(fileno, view[count:], pos + count)
+
+        def __SeekFrom(self, offset: int, startpoint: str) -> int:
+            # Moves the cursor once "Seek" has validated the offset.
             if startpoint == "begin":
                 self.__file.seek(0)
-                return self.Seek(offset, "current")
+                return self.__SeekFrom(offset, "current")
 
             elif startpoint == "current":
                 last_offset = self.__file.tell()
@@ -409,92 +800,50 @@ class LockFile:
                     return self.__file.seek(last_offset + offset)
 
             elif startpoint == "end":
-                self.__file.seek(self.GetFileSize())
-                return self.Seek(offset, "current")
+                self.__file.seek(0, 2)
+                return self.__SeekFrom(offset, "current")
 
             else:
                 raise ValueError(
                     "Invalid value, only begin, current and end are " \
                     + "accepted.")
 
-    def Seek2(self, pos: int) -> int:
-        """Unlike the "Seek" method, this method positions the cursor at the
-         specified position and not in a scrolling manner. Returns an 
-        integer with the new position.
+    def IsWriteable(self) -> bool: return self.__writeable
 
-        It works in the same way as the "seek" method of "open", also this 
-        is equivalent to Seek(pos, "begin").
-        """
-        return self.Seek(pos, "begin")
+    def IsReadable(self) -> bool: return self.__readable
 
-    def Close(self):
-        # Close the file.
-        if platform.startswith("win32"):
-            if isinstance(self.__file, HANDLE): _CloseHandle(self.__file)
-        else:
-            if isinstance(self.__file, IOBase): self.__file.close()
+    def IsBinary(self) -> bool: return self.__binary
 
-        self._filename = b""
-        self._mode = None
-        self.__file = None
-        self.__binary = False
+    def _HaveFileOpen(self):
+        # Check if the file is open.
+        if not self.__opened:
+            raise UnsupportedOperation(
+                "The action cannot be performed until a file is opened.")
 
-    def GetFileSize(self) -> int:
-        """ The current file size is obtained. Returns an integer with the 
-        new position.
-        """
+    def __ValidateAt(self, pos: int, allowed: bool, action: str):
+        # Validations shared by "ReadAt" and "WriteAt".
         self._HaveFileOpen()
 
-        if platform.startswith("win32"):
-            out = LARGE_INTEGER()
-            _return = _GetFileSize(self.__file, byref(out))
-            if not _return: raise OSError(_GetMessageError())
-            return out.value
-
-        else:
-            return getsize(self._filename)
-
-    def GetCursorPos(self) -> int:
-        """The current cursor position is obtained, it is equivalent to 
-        calling Seek(0, "current"). Returns an integer with the new 
-        position.
-        """
-        if platform.startswith("win32"): return self.__Seek(0, 1)
-        else: return self.__file.tell()
+        if not allowed:
+            raise UnsupportedOperation(
+                f"The file was not opened in {action} mode.")
 
-    def IsWriteable(self) -> bool: return self._mode != READMODE
+        if not self.__binary:
+            raise UnsupportedOperation(
+                "The file was not opened in binary mode.")
 
-    def IsReadable(self) -> bool: return self._mode != WRITEMODE
-
-    def IsBinary(self) -> bool: return self.__binary
+        if type(pos) != int:
+            raise TypeError('"pos" must be a integer.')
+        elif pos < 0:
+            raise ValueError('"pos" must be a non-negative integer.')
 
     def _BytesToStr(self, l_bytes: bytes) -> str:
         # Converts a byte literal to a string literal. Windows only.
+        # ISO-8859-1 maps every byte to a character, so it never fails.
         try:
-            return str(l_bytes, encoding = "UTF-8")
+            return l_bytes.decode("UTF-8")
         except UnicodeDecodeError:
-            return str(l_bytes, encoding = "ISO-8859-1")
-
-    def _HaveFileOpen(self):
-        # Check if the file is open.
-        if platform.startswith("win32"):
-            if not isinstance(self.__file, HANDLE):
-                raise UnsupportedOperation(
-                    "The action cannot be performed until a file is opened.")
-
-        else:
-            if not isinstance(self.__file, IOBase):
-                raise UnsupportedOperation(
-                    "The action cannot be performed until a file is opened.")
-
-    def __Seek(self, offset: int, startpoint: str) -> int:
-        """Method that is called after validating everything in "Seek". 
-        Windows only.
-        """
-        out = LARGE_INTEGER()
-        _return = _SetFilePointer(self.__file, offset, byref(out), startpoint)
-        if not _return: raise OSError(_GetMessageError())
-        return out.value
+            return l_bytes.decode("ISO-8859-1")
 
     def __str__(self):
         return f"File: {self._filename} | Size: {self.GetFileSize()} Bytes"
@@ -508,36 +857,32 @@ class LockFile:
     def __del__(self): self.Close()
 
 
-def Open(filename: str, mode: str, encoding: str=None) -> LockFile:
+def Open(filename: str, mode: str, encoding: str=None,
+            access_pattern: str=None, write_through: bool=False) -> LockFile:
     """ This is the same as LockFile("file", "mode", "encoding") or 
     LockFile.Open("file", "mode", "encoding"). Returns a LockFile object.
     """
-    return LockFile(filename, mode, encoding)
+    return LockFile(filename, mode, encoding, access_pattern, write_through)
+
+# Characters and names that cannot be used in a file name:
+_FORBIDDENCHARS = dict.fromkeys(range(32))
+_FORBIDDENCHARSWIN = dict.fromkeys(map(ord, '<>:"/|?*'))
+_RESERVEDNAMES = frozenset((
+    "CON", "PRN", "AUX", "CLOCK$", "NUL", "COM0", "COM1", "COM2", "COM3",
+    "COM4", "COM5", "COM6", "COM7", "COM8", "COM9", "LPT0", "LPT1", "LPT2",
+    "LPT3", "LPT4", "LPT5", "LPT6", "LPT7", "LPT8", "LPT9"))
 
 def _ValidateFileName(filename: str) -> bool:
     # Check if the file name is valid.
-    for c in range(32):
-        if chr(c) in filename: return False
-
-    if not platform.startswith("win32"): return True
-
-    # Windows:
-    for name in (
-            "CON", "PRN", "AUX", "CLOCK$", "NUL", "COM0", "COM1", "COM2",
-            "COM3", "COM4", "COM5", "COM6", "COM7", "COM8", "COM9", "LPT0",
-            "LPT1", "LPT2", "LPT3", "LPT4", "LPT5", "LPT6", "LPT7", "LPT8",
-            "LPT9"):
-
-        for part in filename.split(sep):
-            if part.upper().startswith(name): return False
-
-    if splitdrive(filename)[0] != '':
-        filename = filename[len(splitdrive(filename)[0])+1:]
-    filename = filename.split(sep)
-
-    if platform.startswith("win32"):
-        for c in ("<", ">", ":", '"', "/", "|", "?", "*"):
-            for part in filename:
-                if c in part: return False
-    
-    return True
+    if len(filename.translate(_FORBIDDENCHARS)) != len(filename):
+        return False
+
+    if not _WINDOWS: return True
+
+    # Windows (the spaces before the extension are also ignored):
+    for part in filename.upper().split(sep):
+        if part.split(".", 1)[0].rstrip(" ") in _RESERVEDNAMES: return False
+
+    filename = filename[len(splitdrive(filename)[0]):]
+
+    return len(filename.translate(_FORBIDDENCHARSWIN)) == len(filename)